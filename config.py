@@ -26,4 +26,22 @@ AWS_REGION                  = os.getenv("AWS_REGION", "eu-central-1")
 AWS_BUCKET                  = os.getenv("AWS_BUCKET", "know-malawi")
 AWS_USE_PATH_STYLE_ENDPOINT = False
 
-STORAGE_PREFIX = os.getenv("STORAGE_PREFIX", "")
\ No newline at end of file
+STORAGE_PREFIX = os.getenv("STORAGE_PREFIX", "")
+
+# Compression codec for the DB dump: "gzip" (default) or "zstd".
+# zstd compresses several times faster at a similar ratio and uses all
+# cores natively, but restore tooling must have zstd available.
+BACKUP_COMPRESSION = os.getenv("BACKUP_COMPRESSION", "gzip")
+
+# Compression level for the DB dump (1 = fastest, 9 = smallest).
+# Level 1 is the default: the backup is CPU-bound on compression, and
+# higher levels cost several times the CPU for a marginal size gain.
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "1"))
+
+# Number of parallel media uploads. Each file costs a HEAD + PUT
+# round-trip, so overlapping many requests hides the per-file latency.
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "32"))
+
+# Skip the bucket existence probe entirely (saves a round-trip on
+# cron-driven runs against a bucket known to exist).
+SKIP_BUCKET_CHECK = os.getenv("SKIP_BUCKET_CHECK", "0") == "1"
\ No newline at end of file
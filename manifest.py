@@ -0,0 +1,42 @@
+import os
+import sqlite3
+
+from config import BACKUP_DIR
+
+
+class Manifest:
+    """Persistent record of files known to be uploaded.
+
+    Keyed by local path with the (size, mtime) seen when the file was
+    last confirmed in storage, so a repeat run can skip unchanged files
+    without consulting the remote listing at all. Lives alongside the
+    backups in BACKUP_DIR.
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(BACKUP_DIR, "manifest.db")
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER)"
+        )
+        self.conn.commit()
+
+    def is_current(self, path, size, mtime):
+        """Return True if path was recorded with the same size and mtime."""
+        row = self.conn.execute(
+            "SELECT size, mtime FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime
+
+    def record_many(self, entries):
+        """Record (path, size, mtime) rows in a single transaction."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO files (path, size, mtime) VALUES (?, ?, ?)",
+            entries
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()